@@ -0,0 +1,68 @@
+from web3 import Web3
+from eth_account import Account
+import json
+
+# Chain helpers shared by the oracle processes and the load generator. Only
+# depends on web3/eth-account, so tools can use it without loading the model.
+
+DEFAULT_RPC_URL = "http://127.0.0.1:8545"
+DEFAULT_CONTRACT_ADDRESS = "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512"
+
+# Deployer / owner of the oracle contract (anvil account 0)
+DEFAULT_OWNER_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+# Anvil's default dev accounts are derived from this mnemonic
+ANVIL_MNEMONIC = "test test test test test test test test test test test junk"
+
+# Accounts whose balance drops below this are topped up by fund_accounts
+DEFAULT_MIN_BALANCE = Web3.to_wei(1, 'ether')
+
+ABI_PATH = "API/AIRatingOracleContract.json"
+
+
+def anvil_key(index):
+    """Private key of anvil's default dev account at the given index."""
+    Account.enable_unaudited_hdwallet_features()
+    return Account.from_mnemonic(ANVIL_MNEMONIC, account_path=f"m/44'/60'/0'/0/{index}").key.hex()
+
+
+def load_oracle_contract(w3, contract_address, abi_path=ABI_PATH):
+    """Return a contract instance for the AI rating oracle."""
+    with open(abi_path, "r") as f:
+        abi = json.load(f)["abi"]
+    return w3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=abi)
+
+
+def send_transaction(w3, account, tx_fn, value=0, gas=None, nonce=None, to=None):
+    """
+    Build, sign and send a contract call (or a plain transfer to `to`) and wait for the receipt.
+
+    Gas is estimated by the node when gas is None.
+    """
+    if nonce is None:
+        nonce = w3.eth.get_transaction_count(account.address, 'pending')
+    params = {
+        'from': account.address,
+        'nonce': nonce,
+        'gasPrice': w3.to_wei('1', 'gwei'),
+        'chainId': w3.eth.chain_id,
+        'value': value
+    }
+    if gas is not None:
+        params['gas'] = gas
+    if tx_fn is None:
+        tx = dict(params, to=to)
+    else:
+        tx = tx_fn.build_transaction(params)
+    signed_tx = account.sign_transaction(tx)
+    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+    return w3.eth.wait_for_transaction_receipt(tx_hash)
+
+
+def fund_accounts(w3, funder, addresses, min_balance=DEFAULT_MIN_BALANCE):
+    """Top up every address whose balance is below min_balance from the funder account."""
+    for address in addresses:
+        balance = w3.eth.get_balance(address)
+        if balance < min_balance:
+            receipt = send_transaction(w3, funder, None, value=min_balance - balance, gas=21000, to=address)
+            print(f"Funded {address} with {w3.from_wei(min_balance - balance, 'ether')} ETH, tx hash: {receipt.transactionHash.hex()}")
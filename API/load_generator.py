@@ -0,0 +1,437 @@
+from web3 import Web3
+from eth_account import Account
+import argparse
+import bisect
+import json
+import math
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from web3._utils.events import get_event_data
+from web3.exceptions import TransactionNotFound
+
+from chain_utils import DEFAULT_RPC_URL, anvil_key, fund_accounts, load_oracle_contract, send_transaction
+
+# Load generator for the AI rating oracle. Drives the full ride flow on a local
+# chain for many drivers and riders, then emits sendReview calls (which make the
+# oracle contract emit DriverScoreUpdateRequested) at a configurable rate and
+# burst size, and measures how long a running model_api / model_api_v2 /
+# sharded_oracle instance takes to answer with OracleResponseReceived.
+#
+# Example against a fresh anvil chain (run from the repository root):
+#   python API/load_generator.py --deploy --drivers 10 --riders 10 --reviews 200 --rate 5
+#   python API/model_api_v2.py   # in another terminal, before emission starts
+
+# Addresses produced by script/DeployAndRidePipeline.s.sol on a fresh anvil chain
+DEFAULT_CONTRACTS = {
+    'registration': "0x5FbDB2315678afecb367f032d93F642f64180aa3",
+    'oracle': "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512",
+    'ride_request': "0x9fE46736679d2D9a65F0992F2272dE9f3c7fa6e0",
+    'driver': "0xCf7Ed3AccA5a467e9e704C703E8D87F634fB0Fc9",
+    'rider': "0xDc64a140Aa3E981100a9becA4E685f962f0cF6C9"
+}
+
+# Console labels printed by the deploy script, mapped to DEFAULT_CONTRACTS keys
+DEPLOY_LOG_LABELS = {
+    'Registration Contract Address': 'registration',
+    'AI Rating Oracle Contract Address': 'oracle',
+    'Ride Request Contract Address': 'ride_request',
+    'Driver Contract Address': 'driver',
+    'Rider Contract Address': 'rider'
+}
+
+DRIVER_ABI_PATH = "web-dapp/src/abi/DriverContract.json"
+RIDER_ABI_PATH = "web-dapp/src/abi/RiderContract.json"
+
+# Only the event is needed from RideRequestContract, to recover the id of a new ride
+RIDE_REQUESTED_ABI = {
+    "anonymous": False,
+    "inputs": [
+        {"indexed": False, "internalType": "uint256", "name": "rideId", "type": "uint256"},
+        {"indexed": False, "internalType": "address", "name": "rider", "type": "address"}
+    ],
+    "name": "RideRequested",
+    "type": "event"
+}
+
+DRIVER_COLLATERAL = 1000  # wei, RegistrationContract.initial_collateral
+RIDE_PRICE = 100  # wei
+ACCOUNT_BALANCE = Web3.to_wei(1, 'ether')
+RESPONSE_POLL_INTERVAL = 0.2
+REVIEW_GAS_MARGIN = 1.2  # headroom over the per-review gas estimate
+
+# Fund generated accounts from anvil account 9, so setup never races the oracle's account 0 for nonces
+DEFAULT_FUNDER_INDEX = 9
+
+# Phrases used to build the synthetic review corpus, grouped by intended rating
+REVIEW_PHRASES = {
+    1: ["Horrible ride, the driver was rude and drove dangerously.",
+        "Worst driver ever, never showed up on time and yelled at me.",
+        "Terrible experience, the car was filthy and smelled awful."],
+    2: ["The driver got lost twice and did not seem to care.",
+        "Late pickup and a bumpy ride, not great.",
+        "Car was messy and the driver ignored my directions."],
+    3: ["It was okay. Nothing special but got me where I needed to go.",
+        "Average ride, the driver was quiet.",
+        "The trip took about as long as expected."],
+    4: ["Good ride, the driver was polite and on time.",
+        "Clean car and a smooth trip.",
+        "Nice driver, would ride again."],
+    5: ["Great experience overall. The driver was friendly and the car was clean.",
+        "Excellent driver, super helpful with my bags and very safe.",
+        "Amazing ride, best driver I have had in a long time!"]
+}
+REVIEW_SUFFIXES = ["", " Thanks!", " The music was fine.", " Picked me up at the airport.", " Short trip downtown."]
+
+
+def synthetic_review_corpus(size, seed=42):
+    """Build a list of (expected_rating, review_text) pairs with an even spread of ratings."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        rating = (i % 5) + 1
+        corpus.append((rating, rng.choice(REVIEW_PHRASES[rating]) + rng.choice(REVIEW_SUFFIXES)))
+    rng.shuffle(corpus)
+    return corpus
+
+
+def load_review_corpus(path, size):
+    """Read one review per line from path, cycling through it until size reviews are available."""
+    with open(path, "r") as f:
+        reviews = [line.strip() for line in f if line.strip()]
+    if not reviews:
+        raise ValueError(f"No reviews found in {path}")
+    return [(None, reviews[i % len(reviews)]) for i in range(size)]
+
+
+def deploy_contracts(rpc_url):
+    """Run the Foundry deploy script and return the contract addresses it logs."""
+    print("Deploying contracts with script/DeployAndRidePipeline.s.sol...")
+    result = subprocess.run(
+        ["forge", "script", "script/DeployAndRidePipeline.s.sol", "--rpc-url", rpc_url, "--broadcast"],
+        capture_output=True, text=True, check=True
+    )
+    contracts = {}
+    for line in result.stdout.splitlines():
+        match = re.search(r"([A-Za-z ]+):\s*(0x[0-9a-fA-F]{40})", line)
+        if match and match.group(1).strip() in DEPLOY_LOG_LABELS:
+            contracts[DEPLOY_LOG_LABELS[match.group(1).strip()]] = Web3.to_checksum_address(match.group(2))
+    missing = set(DEFAULT_CONTRACTS) - set(contracts)
+    if missing:
+        raise RuntimeError(f"Could not find deployed addresses for {sorted(missing)} in forge output")
+    return contracts
+
+
+def load_contract(w3, address, abi_path):
+    with open(abi_path, "r") as f:
+        abi = json.load(f)["abi"]
+    return w3.eth.contract(address=Web3.to_checksum_address(address), abi=abi)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+class LoadGenerator:
+    """
+    Stages rides up to the 'arrived' state, then emits their reviews on a schedule.
+
+    Staging happens before measurement so the emission phase consists only of
+    sendReview transactions. A review is only matched once its receipt is
+    confirmed; responses then go to the driver's earliest unanswered request by
+    block and log index, which is the order the oracle handles them in.
+    """
+
+    def __init__(self, w3, contracts, funder, num_drivers, num_riders):
+        self.w3 = w3
+        self.funder = funder
+        self.oracle_contract = load_oracle_contract(w3, contracts['oracle'])
+        self.driver_contract = load_contract(w3, contracts['driver'], DRIVER_ABI_PATH)
+        self.rider_contract = load_contract(w3, contracts['rider'], RIDER_ABI_PATH)
+        self.ride_request_address = Web3.to_checksum_address(contracts['ride_request'])
+        self.drivers = [Account.create() for _ in range(num_drivers)]
+        self.riders = [Account.create() for _ in range(num_riders)]
+
+        self.response_event_abi = self.oracle_contract.events.OracleResponseReceived._get_event_abi()
+        self.response_event_signature_hash = w3.keccak(text="OracleResponseReceived(address,uint256)").hex()
+        self.ride_requested_topic = w3.keccak(text="RideRequested(uint256,address)")
+        self.request_topic = w3.keccak(text="DriverScoreUpdateRequested(address,string)")
+
+        self.lock = threading.Lock()
+        self.unconfirmed = []  # (driver, send timestamp, expected rating, tx hash) of reviews awaiting their receipt
+        # driver -> sorted [(request block/log index, send timestamp, expected rating)]
+        self.outstanding = defaultdict(list)
+        self.latencies = []
+        self.emission_errors = 0
+        self.unmatched_responses = 0
+        # Answered reviews with a known expected rating (synthetic corpus), and how many got that score
+        self.rated = 0
+        self.rating_matches = 0
+        self.first_sent = None
+        self.last_response = None
+        self.collecting = False
+
+    def transact(self, account, tx_fn, value=0):
+        receipt = send_transaction(self.w3, account, tx_fn, value=value, gas=None)
+        if receipt.status != 1:
+            raise RuntimeError(f"Transaction reverted, tx hash: {receipt.transactionHash.hex()}")
+        return receipt
+
+    def register_participants(self):
+        fund_accounts(self.w3, self.funder, [a.address for a in self.drivers + self.riders], ACCOUNT_BALANCE)
+        for driver in self.drivers:
+            self.transact(driver, self.driver_contract.functions.registerAsDriver(), value=DRIVER_COLLATERAL)
+        for rider in self.riders:
+            self.transact(rider, self.rider_contract.functions.registerAsRider())
+        print(f"Registered {len(self.drivers)} drivers and {len(self.riders)} riders")
+
+    def stage_ride(self, rider, driver):
+        receipt = self.transact(rider, self.rider_contract.functions.requestRide(
+            "Troy", "Albany", "2025-07-13 11:00:00", "Load test ride"))
+        ride_id = None
+        for log in receipt.logs:
+            if log['address'] == self.ride_request_address and log['topics'][0] == self.ride_requested_topic:
+                ride_id = get_event_data(self.w3.codec, RIDE_REQUESTED_ABI, log)['args']['rideId']
+        if ride_id is None:
+            raise RuntimeError("RideRequested event not found in requestRide receipt")
+
+        self.transact(driver, self.driver_contract.functions.proposeRidePrice(ride_id, RIDE_PRICE))
+        self.transact(rider, self.rider_contract.functions.selectBestOffer(ride_id), value=RIDE_PRICE)
+        self.transact(rider, self.rider_contract.functions.confirmDeparture(ride_id))
+        self.transact(rider, self.rider_contract.functions.confirmArrival(ride_id))
+        return ride_id
+
+    def stage_rides(self, count):
+        rides = []
+        for i in range(count):
+            rider = self.riders[i % len(self.riders)]
+            driver = self.drivers[i % len(self.drivers)]
+            rides.append((rider, driver, self.stage_ride(rider, driver)))
+        print(f"Staged {len(rides)} rides awaiting review")
+        return rides
+
+    def confirm_reviews(self):
+        """
+        Move mined sendReview transactions from unconfirmed to outstanding.
+
+        A review only becomes matchable once its receipt shows the
+        DriverScoreUpdateRequested log; reverted reviews count as emission errors.
+        """
+        with self.lock:
+            unconfirmed = list(self.unconfirmed)
+        for entry in unconfirmed:
+            driver_address, sent, expected_rating, tx_hash = entry
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            request_position = None
+            if receipt.status == 1:
+                for log in receipt.logs:
+                    if log['address'] == self.oracle_contract.address and log['topics'][0] == self.request_topic:
+                        request_position = (log['blockNumber'], log['logIndex'])
+            with self.lock:
+                self.unconfirmed.remove(entry)
+                if request_position is None:
+                    print(f"Review transaction {tx_hash.hex()} reverted or emitted no score request")
+                    self.emission_errors += 1
+                else:
+                    # The oracle answers a driver's requests in log order
+                    bisect.insort(self.outstanding[driver_address], (request_position, sent, expected_rating))
+
+    def match_responses(self, from_block, to_block):
+        logs = self.w3.eth.get_logs({
+            "address": self.oracle_contract.address,
+            "topics": [self.response_event_signature_hash],
+            "fromBlock": from_block,
+            "toBlock": to_block
+        })
+        now = time.time()
+        for ev in logs:
+            try:
+                args = get_event_data(self.w3.codec, self.response_event_abi, ev)['args']
+            except Exception as e:
+                print(f"Error decoding OracleResponseReceived: {e}")
+                continue
+            with self.lock:
+                if self.outstanding[args['driver']]:
+                    _, sent, expected_rating = self.outstanding[args['driver']].pop(0)
+                    self.latencies.append(now - sent)
+                    self.last_response = now
+                    if expected_rating is not None:
+                        self.rated += 1
+                        self.rating_matches += args['newScore'] == expected_rating
+                else:
+                    self.unmatched_responses += 1
+
+    def collect_responses(self, from_block):
+        next_block = from_block
+        while self.collecting:
+            try:
+                # Read the head first: any response up to it answers a review mined before it,
+                # so confirming receipts next guarantees that review is matchable
+                head = self.w3.eth.block_number
+                self.confirm_reviews()
+                if head >= next_block:
+                    self.match_responses(next_block, head)
+                    next_block = head + 1
+            except Exception as e:
+                print(f"Error collecting responses: {e}")
+            time.sleep(RESPONSE_POLL_INTERVAL)
+
+    def emit_reviews(self, rides, corpus, rate, burst):
+        """Send one review per staged ride, `burst` at a time, averaging `rate` reviews per second."""
+        nonces = {r.address: self.w3.eth.get_transaction_count(r.address, 'pending') for r in self.riders}
+        chain_id = self.w3.eth.chain_id
+        sent_count = 0
+        interval = burst / rate
+        next_burst = time.time()
+
+        for start in range(0, len(rides), burst):
+            delay = next_burst - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            next_burst += interval
+
+            for (rider, driver, ride_id), (expected_rating, feedback) in zip(rides[start:start + burst], corpus[start:start + burst]):
+                entry = None
+                try:
+                    review_fn = self.rider_contract.functions.sendReview(ride_id, feedback)
+                    # Cost grows with the review length, so estimate per review
+                    gas = int(review_fn.estimate_gas({'from': rider.address}) * REVIEW_GAS_MARGIN)
+                    tx = review_fn.build_transaction({
+                        'from': rider.address,
+                        'nonce': nonces[rider.address],
+                        'gas': gas,
+                        'gasPrice': self.w3.to_wei('1', 'gwei'),
+                        'chainId': chain_id
+                    })
+                    signed_tx = rider.sign_transaction(tx)
+                    sent = time.time()
+                    entry = (driver.address, sent, expected_rating, signed_tx.hash)
+                    # Registered before sending so the collector can never see the response first
+                    with self.lock:
+                        self.unconfirmed.append(entry)
+                        if self.first_sent is None:
+                            self.first_sent = sent
+                    self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+                    nonces[rider.address] += 1
+                    sent_count += 1
+                except Exception as e:
+                    print(f"Error sending review for ride {ride_id}: {e}")
+                    with self.lock:
+                        if entry is not None:
+                            self.unconfirmed.remove(entry)
+                        self.emission_errors += 1
+        return sent_count
+
+    def run(self, corpus, rate, burst, timeout):
+        self.register_participants()
+        rides = self.stage_rides(len(corpus))
+
+        self.collecting = True
+        collector = threading.Thread(target=self.collect_responses, args=(self.w3.eth.block_number + 1,), daemon=True)
+        collector.start()
+
+        print(f"Emitting {len(rides)} reviews at {rate} reviews/s in bursts of {burst}...")
+        emission_start = time.time()
+        sent = self.emit_reviews(rides, corpus, rate, burst)
+        emission_time = time.time() - emission_start
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                if not self.unconfirmed and not any(self.outstanding.values()):
+                    break
+            time.sleep(RESPONSE_POLL_INTERVAL)
+        self.collecting = False
+        collector.join()
+
+        return self.report(len(rides), sent, emission_time)
+
+    def report(self, attempted, sent, emission_time):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            timed_out = sum(len(q) for q in self.outstanding.values())
+            # Reviews whose receipt never showed up are emission failures, not oracle timeouts
+            emission_errors = self.emission_errors + len(self.unconfirmed)
+            unmatched = self.unmatched_responses
+            rated, rating_matches = self.rated, self.rating_matches
+        answered = len(latencies)
+        elapsed = (self.last_response - self.first_sent) if answered else None
+        return {
+            'reviews_attempted': attempted,
+            'reviews_sent': sent,
+            'emission_errors': emission_errors,
+            'responses': answered,
+            'unmatched_responses': unmatched,
+            'timed_out': timed_out,
+            'rating_match_rate': rating_matches / rated if rated else None,
+            'error_rate': (attempted - answered) / attempted if attempted else 0.0,
+            'offered_rate': sent / emission_time if emission_time > 0 else None,
+            'throughput': answered / elapsed if elapsed else None,
+            'latency_mean': statistics.mean(latencies) if latencies else None,
+            'latency_p50': percentile(latencies, 50),
+            'latency_p90': percentile(latencies, 90),
+            'latency_p99': percentile(latencies, 99),
+            'latency_max': latencies[-1] if latencies else None
+        }
+
+
+def positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def check_oracle(oracle_url):
+    try:
+        with urllib.request.urlopen(oracle_url, timeout=2) as response:
+            print(f"Oracle at {oracle_url}: {response.read().decode()}")
+    except Exception as e:
+        print(f"Warning: oracle healthcheck at {oracle_url} failed ({e}); responses may time out")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate ride-review load against the AI rating oracle")
+    parser.add_argument("--rpc-url", default=DEFAULT_RPC_URL)
+    parser.add_argument("--deploy", action="store_true", help="Deploy fresh contracts with the Foundry pipeline script")
+    parser.add_argument("--funder-key", default=anvil_key(DEFAULT_FUNDER_INDEX),
+                        help="Key used to fund generated accounts (default: anvil account 9)")
+    parser.add_argument("--oracle-url", default="http://127.0.0.1:5001/", help="Healthcheck URL of the oracle under test")
+    parser.add_argument("--drivers", type=int, default=10)
+    parser.add_argument("--riders", type=int, default=10)
+    parser.add_argument("--reviews", type=int, default=100, help="Number of reviews to emit")
+    parser.add_argument("--rate", type=positive_float, default=5.0, help="Average reviews emitted per second")
+    parser.add_argument("--burst", type=int, default=1, help="Reviews sent back to back per burst")
+    parser.add_argument("--corpus", help="Text file with one review per line (default: synthetic corpus)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for outstanding responses")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    args = parser.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(args.rpc_url))
+    contracts = deploy_contracts(args.rpc_url) if args.deploy else DEFAULT_CONTRACTS
+    check_oracle(args.oracle_url)
+
+    if args.corpus:
+        corpus = load_review_corpus(args.corpus, args.reviews)
+    else:
+        corpus = synthetic_review_corpus(args.reviews)
+
+    generator = LoadGenerator(w3, contracts, w3.eth.account.from_key(args.funder_key), args.drivers, args.riders)
+    report = generator.run(corpus, args.rate, max(1, args.burst), args.timeout)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
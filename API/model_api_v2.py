@@ -6,14 +6,9 @@ import time
 from web3._utils.events import get_event_data
 
 # Custom model prediction imports
-import pickle
-import os
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-import re
-import pandas as pd
+from rating_model import ensure_vader_lexicon, load_model, predict_rating
 
-nltk.download('vader_lexicon')
+ensure_vader_lexicon()
 
 app = Flask(__name__)
 
@@ -37,47 +32,9 @@ event_abi = oracle_contract.events.DriverScoreUpdateRequested._get_event_abi()
 event_signature_hash = w3.keccak(text="DriverScoreUpdateRequested(address,string)").hex()
 
 # Load model
-def load_model(model_path):
-    with open(model_path, 'rb') as file:
-        model_dict = pickle.load(file)
-    return model_dict['vectorizer'], model_dict['model'], model_dict['neutral_lower'], model_dict['neutral_upper']
-
 model_path = 'API/driver_rating_model.pkl'
 vectorizer, model, neutral_lower, neutral_upper = load_model(model_path)
 
-# Preprocess text
-def preprocess_text(text):
-    if not isinstance(text, str) or pd.isna(text):
-        return ""
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-# Prediction function
-def predict_rating(review_text, vectorizer, model, neutral_lower=-0.1, neutral_upper=0.1):
-    sid = SentimentIntensityAnalyzer()
-    processed = preprocess_text(review_text)
-    sentiment = sid.polarity_scores(review_text)['compound']
-    features = vectorizer.transform([processed])
-    model_prediction = model.predict(features)[0]
-    probabilities = model.predict_proba(features)[0]
-    prob_dict = {i+1: prob for i, prob in enumerate(probabilities)}
-
-    final_prediction = model_prediction
-    if neutral_lower <= sentiment <= neutral_upper:
-        final_prediction = 3
-    elif sentiment > 0.7 and model_prediction < 4:
-        final_prediction = max(model_prediction, 4)
-    elif sentiment < -0.7 and model_prediction > 2:
-        final_prediction = min(model_prediction, 2)
-
-    return {
-        'rating': final_prediction,
-        'sentiment': sentiment,
-        'probabilities': prob_dict
-    }
-
 # Main event handler
 def handle_score_update_request(decoded_event):
     driver = decoded_event['args']['driver']
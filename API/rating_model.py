@@ -0,0 +1,60 @@
+import pickle
+import re
+import nltk
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+# Model loading and prediction for the oracle processes. Importing this module has
+# no side effects; call ensure_vader_lexicon() once before predicting.
+
+DEFAULT_MODEL_PATH = "API/driver_rating_model.pkl"
+
+
+def ensure_vader_lexicon():
+    """Download the VADER lexicon if it is not installed yet."""
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon')
+
+
+# Load model
+def load_model(model_path=DEFAULT_MODEL_PATH):
+    with open(model_path, 'rb') as file:
+        model_dict = pickle.load(file)
+    return model_dict['vectorizer'], model_dict['model'], model_dict['neutral_lower'], model_dict['neutral_upper']
+
+
+# Preprocess text
+def preprocess_text(text):
+    if not isinstance(text, str):
+        return ""
+    text = text.lower()
+    text = re.sub(r'[^a-z0-9\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+# Prediction function
+def predict_rating(review_text, vectorizer, model, neutral_lower=-0.1, neutral_upper=0.1, sid=None):
+    if sid is None:
+        sid = SentimentIntensityAnalyzer()
+    processed = preprocess_text(review_text)
+    sentiment = sid.polarity_scores(review_text)['compound']
+    features = vectorizer.transform([processed])
+    model_prediction = model.predict(features)[0]
+    probabilities = model.predict_proba(features)[0]
+    prob_dict = {i+1: prob for i, prob in enumerate(probabilities)}
+
+    final_prediction = model_prediction
+    if neutral_lower <= sentiment <= neutral_upper:
+        final_prediction = 3
+    elif sentiment > 0.7 and model_prediction < 4:
+        final_prediction = max(model_prediction, 4)
+    elif sentiment < -0.7 and model_prediction > 2:
+        final_prediction = min(model_prediction, 2)
+
+    return {
+        'rating': final_prediction,
+        'sentiment': sentiment,
+        'probabilities': prob_dict
+    }
@@ -0,0 +1,423 @@
+from web3 import Web3
+from eth_account import Account
+from flask import Flask, jsonify
+import argparse
+import json
+import multiprocessing
+import os
+import threading
+import time
+import urllib.request
+from web3._utils.events import get_event_data
+from web3.exceptions import TimeExhausted
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from chain_utils import (
+    DEFAULT_CONTRACT_ADDRESS,
+    DEFAULT_OWNER_KEY,
+    DEFAULT_RPC_URL,
+    anvil_key,
+    fund_accounts,
+    load_oracle_contract,
+    send_transaction,
+)
+from rating_model import DEFAULT_MODEL_PATH, ensure_vader_lexicon, load_model, predict_rating
+
+# Sharded oracle mode: DriverScoreUpdateRequested events are partitioned across
+# N worker processes by a hash of the driver address. Every worker signs with its
+# own key (registered through AIRatingOracleContract.addAllowedCaller), so each
+# shard has an independent nonce sequence, and a driver always lands on the same
+# shard, which keeps that driver's score updates in order.
+#
+# Example against a local anvil chain (run from the repository root):
+#   python API/sharded_oracle.py --workers 4
+#   python API/sharded_oracle.py --workers 4 --model-path Rating_Model/Model/driver_rating_model_compact.pkl
+#
+# Or split the same 4 shards over two nodes:
+#   node A: python API/sharded_oracle.py --workers 4 --shards 0,1 --remote-workers http://nodeB:5103/shards,http://nodeB:5104/shards
+#   node B: python API/sharded_oracle.py --workers 4 --shards 2,3
+
+# Worker keys are derived from anvil's default mnemonic unless ORACLE_WORKER_KEYS is set.
+# They start past the 10 pre-funded accounts, which the deploy scripts and the load
+# generator use, and are funded by the owner on startup.
+WORKER_KEY_OFFSET = 10
+
+POLL_INTERVAL = 2
+
+# Seconds to wait for a sent score update before checking whether it was dropped
+RECEIPT_TIMEOUT = 30
+
+# Shard i serves its own progress report on DEFAULT_WORKER_PORT_BASE + i
+DEFAULT_WORKER_PORT_BASE = 5101
+
+
+def shard_for_driver(driver, num_shards):
+    """
+    Deterministically map a driver address to a shard index.
+
+    Uses keccak over the address bytes rather than Python's hash(), which is
+    salted per process and would disagree between workers.
+    """
+    digest = Web3.keccak(hexstr=Web3.to_checksum_address(driver))
+    return int.from_bytes(digest[:8], "big") % num_shards
+
+
+def derive_worker_keys(num_workers):
+    """Return one private key per worker, from ORACLE_WORKER_KEYS or the anvil mnemonic."""
+    env_keys = os.environ.get("ORACLE_WORKER_KEYS")
+    if env_keys:
+        keys = [k.strip() for k in env_keys.split(",") if k.strip()]
+        if len(keys) < num_workers:
+            raise ValueError(f"ORACLE_WORKER_KEYS has {len(keys)} keys but {num_workers} workers were requested")
+        return keys[:num_workers]
+
+    return [anvil_key(WORKER_KEY_OFFSET + i) for i in range(num_workers)]
+
+
+def register_workers(w3, oracle_contract, owner, worker_addresses):
+    """Register every worker signer as an allowed caller on the oracle contract."""
+    for address in worker_addresses:
+        if oracle_contract.functions.allowedCallers(address).call():
+            continue
+        receipt = send_transaction(w3, owner, oracle_contract.functions.addAllowedCaller(address), gas=100000)
+        print(f"Registered oracle worker {address} as allowed caller, tx hash: {receipt.transactionHash.hex()}")
+
+
+class ShardWorker:
+    """
+    Consumes the DriverScoreUpdateRequested events of a single shard.
+
+    Events are fetched by block range and handled strictly in log order, so the
+    updates of any driver in this shard are submitted in the order they were
+    requested. A failed event blocks the shard and is retried rather than
+    skipped, but an update that has been sent is never sent again. The nonce is
+    tracked locally since this worker is the only user of its signing key.
+    """
+
+    def __init__(self, shard_id, num_shards, private_key, rpc_url, contract_address, model_path, start_block):
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.oracle_contract = load_oracle_contract(self.w3, contract_address)
+        self.account = self.w3.eth.account.from_key(private_key)
+        self.chain_id = self.w3.eth.chain_id
+        self.nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        self.next_block = start_block
+        # (block number, log index) of the last event this worker handled
+        self.last_handled = (-1, -1)
+        # (position, driver, score, tx hash, nonce) of a sent update whose receipt is not seen yet
+        self.in_flight = None
+
+        # Progress counters served on this worker's /shards endpoint
+        self.head_block = start_block - 1
+        self.last_block = start_block - 1
+        self.pending = 0
+        self.processed = 0
+        self.errors = 0
+
+        self.event_abi = self.oracle_contract.events.DriverScoreUpdateRequested._get_event_abi()
+        self.event_signature_hash = self.w3.keccak(text="DriverScoreUpdateRequested(address,string)").hex()
+
+        # Loaded per worker process, not in the coordinator
+        vectorizer, model, neutral_lower, neutral_upper = load_model(model_path)
+        sid = SentimentIntensityAnalyzer()
+        self.score = lambda feedback: predict_rating(feedback, vectorizer, model, neutral_lower, neutral_upper, sid)
+
+    def log(self, message):
+        print(f"[shard {self.shard_id}] {message}")
+
+    def score_feedback(self, feedback):
+        try:
+            result = self.score(feedback)
+            return int(abs(result['rating']))
+        except Exception as e:
+            self.log(f"Error in model prediction: {e}")
+            return 3  # default neutral
+
+    def send_score(self, position, driver, new_score):
+        """
+        Sign and send updateDriverScore for the event at `position`.
+
+        The transaction is recorded as in flight before it is sent, so if the send
+        itself fails we can still find out whether it reached the node.
+        """
+        tx = self.oracle_contract.functions.updateDriverScore(driver, new_score).build_transaction({
+            'from': self.account.address,
+            'nonce': self.nonce,
+            'gas': 100000,
+            'gasPrice': self.w3.to_wei('1', 'gwei'),
+            'chainId': self.chain_id
+        })
+        signed_tx = self.account.sign_transaction(tx)
+        self.in_flight = (position, driver, new_score, signed_tx.hash, self.nonce)
+        self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+        self.nonce += 1
+
+    def check_in_flight(self):
+        """
+        Wait for the in-flight transaction to resolve.
+
+        Returns True once it is mined (the event is done, even if it reverted) and
+        False otherwise. If the node never accepted it, the in-flight record is
+        cleared so the event is sent again on the next poll.
+        """
+        position, driver, new_score, tx_hash, nonce = self.in_flight
+        try:
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT)
+        except TimeExhausted:
+            # The nonce is still free only if the node never saw this transaction
+            if self.w3.eth.get_transaction_count(self.account.address, 'pending') <= nonce:
+                self.log(f"Transaction {tx_hash.hex()} never reached the node, resending")
+                self.in_flight = None
+                self.nonce = nonce
+            return False
+
+        self.in_flight = None
+        self.nonce = max(self.nonce, nonce + 1)
+        if receipt.status != 1:
+            self.log(f"updateDriverScore reverted, tx hash: {tx_hash.hex()}")
+            self.errors += 1
+        else:
+            self.log(f"Updated driver {driver} with new score of {new_score}, tx hash: {tx_hash.hex()}")
+            self.processed += 1
+        return True
+
+    def handle_event(self, decoded_event):
+        """
+        Handle one event, returning True once it is done and False to retry it later.
+
+        Failures before the transaction is sent are retried, since nothing can have
+        reached the chain yet. Once sent, the event is only done when its receipt
+        shows up: every updateDriverScore call is averaged into the rating, so it
+        must never be sent twice.
+        """
+        position = (decoded_event['blockNumber'], decoded_event['logIndex'])
+        if self.in_flight is None:
+            driver = decoded_event['args']['driver']
+            feedback = decoded_event['args']['feedback']
+            self.log(f"Received score update request for {driver} with feedback: '{feedback}'")
+            try:
+                self.send_score(position, driver, self.score_feedback(feedback))
+            except Exception as e:
+                if self.in_flight is None:
+                    self.log(f"Error preparing score update, will retry: {e}")
+                    self.resync_nonce()
+                    return False
+                self.log(f"Error sending score update, checking whether it reached the node: {e}")
+
+        try:
+            return self.check_in_flight()
+        except Exception as e:
+            self.log(f"Error checking transaction, will retry: {e}")
+            return False
+
+    def poll_once(self):
+        head = self.w3.eth.block_number
+        self.head_block = head
+        if head < self.next_block:
+            return
+        logs = self.w3.eth.get_logs({
+            "address": self.oracle_contract.address,
+            "topics": [self.event_signature_hash],
+            "fromBlock": self.next_block,
+            "toBlock": head
+        })
+
+        mine = []
+        for event in logs:
+            try:
+                decoded_event = get_event_data(self.w3.codec, self.event_abi, event)
+            except Exception as e:
+                self.log(f"Error decoding event: {e}")
+                continue
+            if shard_for_driver(decoded_event['args']['driver'], self.num_shards) == self.shard_id:
+                mine.append(decoded_event)
+
+        # Skip anything already handled in case this range is fetched again
+        mine = [e for e in mine if (e['blockNumber'], e['logIndex']) > self.last_handled]
+
+        self.pending = len(mine)
+        for decoded_event in mine:
+            if not self.handle_event(decoded_event):
+                # Keep next_block so this event (and the rest of the range) is retried in order
+                return
+            self.last_handled = (decoded_event['blockNumber'], decoded_event['logIndex'])
+            self.pending -= 1
+            # Later events of the same block may still be queued, so only the previous block is complete
+            self.last_block = decoded_event['blockNumber'] - 1
+
+        self.last_block = head
+        self.next_block = head + 1
+
+    def resync_nonce(self):
+        """Reload the nonce in case a failed transaction never consumed it."""
+        try:
+            self.nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        except Exception as e:
+            self.log(f"Error resyncing nonce: {e}")
+
+    def shard_report(self):
+        return {
+            'shard': self.shard_id,
+            'num_shards': self.num_shards,
+            'worker': self.account.address,
+            'head_block': self.head_block,
+            'last_block': self.last_block,
+            'lag_blocks': max(0, self.head_block - self.last_block),
+            'pending': self.pending,
+            'processed': self.processed,
+            'errors': self.errors
+        }
+
+    def serve_report(self, port):
+        """Serve this shard's progress over HTTP so it can be read from any host."""
+        worker_app = Flask(f"shard-{self.shard_id}")
+        worker_app.add_url_rule("/shards", "shards", lambda: jsonify(self.shard_report()))
+        worker_app.run(host="0.0.0.0", port=port)
+
+    def run(self, report_port):
+        threading.Thread(target=self.serve_report, args=(report_port,), daemon=True).start()
+        self.log(f"Listening for DriverScoreUpdateRequested events as {self.account.address}...")
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.log(f"Error polling events: {e}")
+            time.sleep(POLL_INTERVAL)
+
+
+def run_worker(shard_id, num_shards, private_key, rpc_url, contract_address, model_path, start_block, report_port):
+    """Process entry point for a single shard worker."""
+    ShardWorker(shard_id, num_shards, private_key, rpc_url, contract_address, model_path, start_block).run(report_port)
+
+
+def fetch_shard_report(url):
+    """Read one worker's /shards endpoint."""
+    with urllib.request.urlopen(url, timeout=2) as response:
+        return json.loads(response.read().decode())
+
+
+class ShardCoordinator:
+    """
+    Registers the worker signers, starts one process per local shard and reports per-shard lag.
+
+    A node runs any subset of the N shards (all of them by default), so the
+    shards can be spread over several hosts that each run a coordinator with
+    the same --workers and disjoint --shards. Every worker serves its own
+    /shards endpoint; the coordinator only aggregates those over HTTP, plus
+    the endpoints of remote workers if given. Lag is measured in blocks between
+    the chain head and the last block a shard has fully processed.
+    """
+
+    def __init__(self, num_workers, rpc_url=DEFAULT_RPC_URL, contract_address=DEFAULT_CONTRACT_ADDRESS,
+                 owner_key=DEFAULT_OWNER_KEY, worker_keys=None, model_path=DEFAULT_MODEL_PATH, shard_ids=None,
+                 worker_port_base=DEFAULT_WORKER_PORT_BASE, remote_worker_urls=None):
+        self.num_workers = num_workers
+        self.shard_ids = sorted(shard_ids) if shard_ids is not None else list(range(num_workers))
+        if any(shard_id < 0 or shard_id >= num_workers for shard_id in self.shard_ids):
+            raise ValueError(f"Shard ids must be between 0 and {num_workers - 1}, got {self.shard_ids}")
+        self.model_path = model_path
+        self.rpc_url = rpc_url
+        self.contract_address = Web3.to_checksum_address(contract_address)
+        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        self.oracle_contract = load_oracle_contract(self.w3, self.contract_address)
+        self.owner = self.w3.eth.account.from_key(owner_key)
+        # Keys are indexed by shard id, so every node derives the same signer for a shard
+        self.worker_keys = worker_keys or derive_worker_keys(num_workers)
+        self.worker_addresses = {i: Account.from_key(self.worker_keys[i]).address for i in self.shard_ids}
+        self.worker_ports = {i: worker_port_base + i for i in self.shard_ids}
+        self.worker_urls = {i: f"http://127.0.0.1:{port}/shards" for i, port in self.worker_ports.items()}
+        self.remote_worker_urls = remote_worker_urls or []
+        self.processes = {}
+
+    def start(self):
+        # Download once here rather than racing from every worker process
+        ensure_vader_lexicon()
+        addresses = list(self.worker_addresses.values())
+        fund_accounts(self.w3, self.owner, addresses)
+        register_workers(self.w3, self.oracle_contract, self.owner, addresses)
+
+        start_block = self.w3.eth.block_number + 1
+        for shard_id in self.shard_ids:
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(shard_id, self.num_workers, self.worker_keys[shard_id], self.rpc_url,
+                      self.contract_address, self.model_path, start_block, self.worker_ports[shard_id]),
+                daemon=True
+            )
+            process.start()
+            self.processes[shard_id] = process
+        print(f"Started shards {self.shard_ids} of {self.num_workers} from block {start_block}")
+
+    def shard_report(self):
+        shards = []
+        for shard_id in self.shard_ids:
+            try:
+                report = fetch_shard_report(self.worker_urls[shard_id])
+            except Exception as e:
+                report = {'shard': shard_id, 'worker': self.worker_addresses[shard_id], 'error': str(e)}
+            report['alive'] = self.processes[shard_id].is_alive() if shard_id in self.processes else False
+            shards.append(report)
+        for url in self.remote_worker_urls:
+            try:
+                shards.append(fetch_shard_report(url))
+            except Exception as e:
+                shards.append({'url': url, 'error': str(e)})
+        return {'head_block': self.w3.eth.block_number, 'shards': shards}
+
+    def report_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                report = self.shard_report()
+            except Exception as e:
+                print(f"Error building shard report: {e}")
+                continue
+            lags = ", ".join(f"{s.get('shard', s.get('url'))}:{s.get('lag_blocks', 'unreachable')}"
+                             for s in report['shards'])
+            print(f"Head block {report['head_block']}, shard lag (blocks) {lags}")
+
+
+app = Flask(__name__)
+coordinator = None
+
+
+@app.route("/")
+def healthcheck():
+    return "Sharded oracle is running!"
+
+
+@app.route("/shards")
+def shards():
+    return jsonify(coordinator.shard_report())
+
+
+def parse_id_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the AI rating oracle as N workers sharded by driver address")
+    parser.add_argument("--workers", type=int, default=2, help="Total number of shards across all nodes")
+    parser.add_argument("--shards", type=parse_id_list,
+                        help="Comma-separated shard ids to run on this node (default: all)")
+    parser.add_argument("--rpc-url", default=DEFAULT_RPC_URL)
+    parser.add_argument("--contract", default=DEFAULT_CONTRACT_ADDRESS, help="AIRatingOracleContract address")
+    parser.add_argument("--owner-key", default=DEFAULT_OWNER_KEY, help="Owner key used to register worker signers")
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, help="Pickled rating model loaded by every worker")
+    parser.add_argument("--worker-port-base", type=int, default=DEFAULT_WORKER_PORT_BASE,
+                        help="Shard i serves its /shards report on this port + i")
+    parser.add_argument("--remote-workers", type=lambda v: [u for u in v.split(",") if u.strip()], default=[],
+                        help="Comma-separated /shards URLs of workers on other nodes to include in the report")
+    parser.add_argument("--report-interval", type=float, default=10, help="Seconds between lag reports")
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+
+    coordinator = ShardCoordinator(args.workers, args.rpc_url, args.contract, args.owner_key,
+                                   model_path=args.model_path, shard_ids=args.shards,
+                                   worker_port_base=args.worker_port_base, remote_worker_urls=args.remote_workers)
+    coordinator.start()
+
+    report_thread = threading.Thread(target=coordinator.report_loop, args=(args.report_interval,), daemon=True)
+    report_thread.start()
+    app.run(port=args.port)
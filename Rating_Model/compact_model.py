@@ -0,0 +1,354 @@
+import copy
+import json
+import os
+import pickle
+import time
+import numpy as np
+from sklearn.metrics import accuracy_score
+
+from training_model import (
+    ensure_dir,
+    load_config,
+    load_model,
+    load_reviews,
+    load_split,
+    predict_rating,
+)
+
+# A weight is negligible if it is at most this fraction of its class's largest |weight|.
+# The model is L2-regularised, so an absolute threshold would match almost nothing.
+NEGLIGIBLE_WEIGHT_FRACTION = 0.02
+
+# How many times to halve the fraction when zeroing costs more than the budget, before giving up on zeroing
+ZEROING_ATTEMPTS = 4
+
+# Default validation accuracy we are willing to lose to shrink the vocabulary
+DEFAULT_ACCURACY_LOSS_BUDGET = 0.005
+
+# Store the coefficient matrix as scipy sparse only if at most this fraction of it is non-zero
+SPARSIFY_MAX_DENSITY = 0.5
+
+# Number of repetitions used for the load time measurement
+LOAD_REPEATS = 5
+
+# Number of held-out reviews used for the end-to-end latency measurement (VADER dominates it)
+END_TO_END_SAMPLE = 200
+
+# Compute how much each vocabulary entry matters to the classifier
+def feature_importance(model):
+    """
+    Importance of every feature as its largest absolute weight over all classes
+
+    Args:
+        model: The trained (one-vs-rest) LogisticRegression
+
+    Returns:
+        ndarray: One importance value per feature column
+    """
+    coef = model.coef_.toarray() if hasattr(model.coef_, 'toarray') else model.coef_
+    return np.abs(coef).max(axis=0)
+
+# Find weights that are negligible relative to their class
+def negligible_weights(coef, fraction=NEGLIGIBLE_WEIGHT_FRACTION):
+    """
+    Mask of weights at most fraction of their class's largest |weight|
+
+    Args:
+        coef (ndarray): Dense coefficient matrix (classes x features)
+        fraction (float): Relative threshold; 0 only matches weights that are already zero
+
+    Returns:
+        ndarray: Boolean mask with the same shape as coef
+    """
+    scale = np.abs(coef).max(axis=1, keepdims=True)
+    return np.abs(coef) <= fraction * scale
+
+# Zero the negligible weights of a classifier
+def zero_negligible_weights(model, fraction=NEGLIGIBLE_WEIGHT_FRACTION):
+    """
+    Copy the classifier with its negligible weights set to zero
+
+    Args:
+        model: The trained LogisticRegression
+        fraction (float): Relative threshold passed to negligible_weights
+
+    Returns:
+        tuple: (classifier copy, number of non-zero weights zeroed)
+    """
+    coef = model.coef_.toarray() if hasattr(model.coef_, 'toarray') else model.coef_
+    mask = negligible_weights(coef, fraction)
+    compact = copy.deepcopy(model)
+    compact.coef_ = np.where(mask, 0.0, coef)
+    return compact, int(np.count_nonzero(coef[mask]))
+
+# Build a vectorizer restricted to the kept features
+def prune_vectorizer(vectorizer, kept):
+    """
+    Copy the fitted CountVectorizer with only the kept vocabulary entries
+
+    Args:
+        vectorizer: The fitted CountVectorizer
+        kept (ndarray): Sorted column indices to keep
+
+    Returns:
+        CountVectorizer: Vectorizer whose columns line up with kept
+    """
+    if len(kept) == 0:
+        raise ValueError("Cannot prune the vocabulary to zero features: the classifier has no non-zero weights")
+
+    feature_names = vectorizer.get_feature_names_out()
+    compact = copy.deepcopy(vectorizer)
+    compact.vocabulary_ = {feature_names[j]: i for i, j in enumerate(kept)}
+
+    # stop_words_ only records terms cut during fitting and is not needed to transform
+    if hasattr(compact, 'stop_words_'):
+        del compact.stop_words_
+
+    # Don't generate n-grams longer than any surviving entry (e.g. skip bigrams entirely)
+    min_n, max_n = compact.ngram_range
+    longest = max(len(term.split(' ')) for term in compact.vocabulary_)
+    compact.ngram_range = (min_n, max(min_n, min(max_n, longest)))
+    return compact
+
+# Build a classifier restricted to the kept features
+def prune_classifier(model, kept):
+    """
+    Copy the trained LogisticRegression with only the kept coefficient columns
+
+    Args:
+        model: The trained LogisticRegression
+        kept (ndarray): Sorted column indices to keep
+
+    Returns:
+        LogisticRegression: Classifier expecting len(kept) features
+    """
+    coef = model.coef_.toarray() if hasattr(model.coef_, 'toarray') else model.coef_
+    compact = copy.deepcopy(model)
+    compact.coef_ = np.ascontiguousarray(coef[:, kept])
+    compact.n_features_in_ = len(kept)
+    return compact
+
+# Pick the smallest vocabulary that stays within the accuracy budget
+def select_features(model, X_val, y_val, accuracy_loss_budget):
+    """
+    Zero negligible weights, drop n-grams that no class uses, then remove the
+    lowest-weight entries while the validation accuracy stays within the budget.
+    Every candidate is checked against the budget, including zeroing on its own:
+    if that already costs too much the threshold is halved, and zeroing is
+    skipped altogether if no threshold fits.
+
+    Args:
+        model: The trained LogisticRegression
+        X_val: Bag-of-words features of the validation reviews (original vocabulary)
+        y_val: Ratings of the validation reviews
+        accuracy_loss_budget (float): Maximum allowed accuracy drop
+
+    Returns:
+        tuple: (classifier with negligible weights zeroed, kept column indices,
+                negligible weight fraction used, number of weights zeroed,
+                number of unused n-grams dropped)
+    """
+    baseline = accuracy_score(y_val, model.predict(X_val))
+
+    # Weakest thresholds last; a fraction of 0 zeroes nothing and matches the original model
+    fractions = [NEGLIGIBLE_WEIGHT_FRACTION / 2 ** i for i in range(ZEROING_ATTEMPTS + 1)] + [0.0]
+    for fraction in fractions:
+        zeroed, num_zeroed = zero_negligible_weights(model, fraction)
+        importance = feature_importance(zeroed)
+
+        used = np.flatnonzero(importance > 0)
+        num_unused = len(importance) - len(used)
+
+        # Used features ordered from least to most important
+        ranked = used[np.argsort(importance[used], kind='stable')]
+
+        def accuracy_without(num_removed):
+            kept = np.sort(ranked[num_removed:])
+            compact = prune_classifier(zeroed, kept)
+            return accuracy_score(y_val, compact.predict(X_val[:, kept]))
+
+        if len(ranked) > 0 and baseline - accuracy_without(0) <= accuracy_loss_budget:
+            break
+        print(f"Zeroing weights below {fraction:.4g} of the class maximum exceeds the budget, trying a lower threshold")
+    else:
+        raise ValueError("The classifier has no non-zero weights to keep")
+
+    # Binary search for the largest number of low-weight entries we can remove.
+    # Removing none is known to fit the budget, and at least one feature is always kept.
+    low, high = 0, len(ranked) - 1
+    while low < high:
+        mid = (low + high + 1) // 2
+        if baseline - accuracy_without(mid) <= accuracy_loss_budget:
+            low = mid
+        else:
+            high = mid - 1
+
+    return zeroed, np.sort(ranked[low:]), fraction, num_zeroed, num_unused
+
+# Switch to a sparse coefficient matrix when it pays off
+def sparsify_classifier(model):
+    """
+    Store the coefficients as a sparse matrix if they are mostly zero
+
+    Args:
+        model: The (pruned) LogisticRegression, modified in place
+
+    Returns:
+        float: Density of the coefficient matrix
+    """
+    density = np.count_nonzero(model.coef_) / model.coef_.size
+    if density <= SPARSIFY_MAX_DENSITY:
+        model.sparsify()
+    return density
+
+# Save a model in the same format as training_model.main
+def save_model(model_path, vectorizer, model, neutral_lower, neutral_upper):
+    """Pickle the model components and return the artifact size in bytes"""
+    ensure_dir(model_path)
+    model_dict = {
+        'vectorizer': vectorizer,
+        'model': model,
+        'neutral_lower': neutral_lower,
+        'neutral_upper': neutral_upper
+    }
+    with open(model_path, 'wb') as file:
+        pickle.dump(model_dict, file)
+    return os.path.getsize(model_path)
+
+# Measure how long a saved model takes to load
+def measure_load_time(model_path, repeats=LOAD_REPEATS):
+    """Best-of-N time in seconds to unpickle the model file"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load_model(model_path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+# Measure the per-review serving latency
+def measure_latency(reviews, processed_reviews, vectorizer, model, neutral_lower, neutral_upper):
+    """
+    Average per-review latency, one review at a time as the oracle serves them
+
+    Args:
+        reviews (list): Raw review texts
+        processed_reviews (list): Preprocessed review texts
+        vectorizer, model: Model components to time
+        neutral_lower, neutral_upper: Sentiment thresholds
+
+    Returns:
+        dict: Model-only and end-to-end (predict_rating) latency in milliseconds
+    """
+    start = time.perf_counter()
+    for text in processed_reviews:
+        features = vectorizer.transform([text])
+        model.predict(features)
+        model.predict_proba(features)
+    model_only = (time.perf_counter() - start) / len(processed_reviews)
+
+    sample = reviews[:END_TO_END_SAMPLE]
+    start = time.perf_counter()
+    for text in sample:
+        predict_rating(text, vectorizer, model, neutral_lower, neutral_upper)
+    end_to_end = (time.perf_counter() - start) / len(sample)
+
+    return {
+        'model_ms': model_only * 1000,
+        'end_to_end_ms': end_to_end * 1000
+    }
+
+def main(config_path="config.yaml"):
+    """Compact the model saved by training_model.main and write a report"""
+    print(f"Loading configuration from {config_path}")
+    config = load_config(config_path)
+    model_path = config.get('model_path')
+    compact_model_path = config.get('compact_model_path')
+    report_path = config.get('compact_report_path')
+    accuracy_loss_budget = float(config.get('accuracy_loss_budget', DEFAULT_ACCURACY_LOSS_BUDGET))
+
+    vectorizer, model, neutral_lower, neutral_upper = load_model(model_path)
+
+    # Reuse the split saved by training, with the labels the model was trained on.
+    # The cut-off is chosen on the held-out validation rows; the test rows are only used for the report.
+    df = load_reviews(config.get('converted_train'))
+    _, _, val_index, y_val, test_index, y_test = load_split(config.get('split_path'))
+    validation = df.loc[val_index]
+    test = df.loc[test_index]
+
+    X_val_bow = vectorizer.transform(validation['processed_text']).tocsc()
+
+    print(f"\nPruning vocabulary of {len(vectorizer.vocabulary_)} features "
+          f"with an accuracy loss budget of {accuracy_loss_budget:.4f}...")
+    zeroed, kept, fraction, num_zeroed, num_unused = select_features(model, X_val_bow, y_val, accuracy_loss_budget)
+    compact_vectorizer = prune_vectorizer(vectorizer, kept)
+    compact_model = prune_classifier(zeroed, kept)
+    density = sparsify_classifier(compact_model)
+
+    original_size = os.path.getsize(model_path)
+    compact_size = save_model(compact_model_path, compact_vectorizer, compact_model, neutral_lower, neutral_upper)
+    print(f"Saved compact model to {os.path.basename(compact_model_path)}")
+
+    original_accuracy = accuracy_score(y_test, model.predict(vectorizer.transform(test['processed_text'])))
+    compact_accuracy = accuracy_score(y_test, compact_model.predict(compact_vectorizer.transform(test['processed_text'])))
+    exceeds_budget = original_accuracy - compact_accuracy > accuracy_loss_budget
+
+    reviews = list(test['text'])
+    processed_reviews = list(test['processed_text'])
+    original_latency = measure_latency(reviews, processed_reviews, vectorizer, model, neutral_lower, neutral_upper)
+    compact_latency = measure_latency(reviews, processed_reviews, compact_vectorizer, compact_model, neutral_lower, neutral_upper)
+
+    report = {
+        'accuracy_loss_budget': accuracy_loss_budget,
+        'negligible_weight_fraction': fraction,
+        'weights_zeroed': num_zeroed,
+        'validation_reviews': len(y_val),
+        'test_reviews': len(y_test),
+        'features': {
+            'original': len(vectorizer.vocabulary_),
+            'compact': len(compact_vectorizer.vocabulary_),
+            'unused_dropped': num_unused,
+            'ngram_range': list(compact_vectorizer.ngram_range)
+        },
+        'coef_density': density,
+        'coef_sparse': hasattr(compact_model.coef_, 'toarray'),
+        'accuracy': {
+            'original': original_accuracy,
+            'compact': compact_accuracy,
+            'delta': compact_accuracy - original_accuracy,
+            'exceeds_budget': exceeds_budget
+        },
+        'artifact_bytes': {
+            'original': original_size,
+            'compact': compact_size
+        },
+        'load_time_s': {
+            'original': measure_load_time(model_path),
+            'compact': measure_load_time(compact_model_path)
+        },
+        'latency_ms': {
+            'original': original_latency,
+            'compact': compact_latency
+        }
+    }
+
+    if report_path:
+        ensure_dir(report_path)
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved compaction report to {os.path.basename(report_path)}")
+
+    print(f"\nFeatures: {report['features']['original']} -> {report['features']['compact']} "
+          f"({num_unused} unused n-grams dropped, {num_zeroed} negligible weights zeroed)")
+    print(f"Test accuracy: {original_accuracy:.4f} -> {compact_accuracy:.4f} ({report['accuracy']['delta']:+.4f})")
+    if exceeds_budget:
+        print(f"Warning: the test accuracy loss exceeds the budget of {accuracy_loss_budget:.4f} "
+              f"(the cut-off was chosen on {len(y_val)} validation reviews)")
+    print(f"Artifact size: {original_size} -> {compact_size} bytes")
+    print(f"Load time: {report['load_time_s']['original'] * 1000:.2f} -> {report['load_time_s']['compact'] * 1000:.2f} ms")
+    print(f"Per-review model latency: {original_latency['model_ms']:.3f} -> {compact_latency['model_ms']:.3f} ms")
+    print(f"Per-review end-to-end latency: {original_latency['end_to_end_ms']:.3f} -> {compact_latency['end_to_end_ms']:.3f} ms")
+
+    return compact_vectorizer, compact_model
+
+if __name__ == "__main__":
+    main("config.yaml")
@@ -3,6 +3,7 @@ import numpy as np
 import re
 import ast
 import pickle
+import json
 import os
 import yaml
 from sklearn.model_selection import train_test_split
@@ -18,6 +19,14 @@ import seaborn as sns
 NEUTRAL_LOWER = -0.1
 NEUTRAL_UPPER = 0.1
 
+# Train/validation/test split settings (VALIDATION_SIZE is a fraction of the non-test rows)
+TEST_SIZE = 0.2
+VALIDATION_SIZE = 0.2
+SPLIT_RANDOM_STATE = 42
+
+# Seed for choosing which neutral reviews get relabelled, so the split is reproducible
+ADJUSTMENT_RANDOM_STATE = 42
+
 # Preprocess text function (defined globally so it can be pickled)
 def preprocess_text(text):
     """Basic text preprocessing"""
@@ -79,6 +88,98 @@ def ensure_dir(file_path):
     if directory and not os.path.exists(directory):
         os.makedirs(directory)
 
+# Extract the numeric rating from a prediction/annotation column value
+def extract_rating(prediction_str):
+    """Extract the numeric rating from the prediction string"""
+    if pd.isna(prediction_str):
+        return None
+    try:
+        # Parse the string representation of the list containing a dictionary
+        prediction_list = ast.literal_eval(prediction_str.replace("'", "\""))
+        # Extract the label from the first item
+        rating = int(prediction_list[0]['label'])
+        return rating
+    except:
+        return None
+
+# Load the review dataset
+def load_reviews(data_path):
+    """
+    Load the review CSV, extract ratings and preprocess the text
+    
+    Args:
+        data_path (str): Path to the converted training CSV
+        
+    Returns:
+        DataFrame: Clean reviews with 'text', 'rating' and 'processed_text' columns
+    """
+    print(f"Loading data from: {os.path.basename(data_path)}")
+    df = pd.read_csv(data_path)
+    print(f"Loaded {len(df)} reviews")
+    
+    # Extract ratings
+    if 'prediction' in df.columns:
+        df['rating'] = df['prediction'].apply(extract_rating)
+    elif 'annotation' in df.columns and not df['annotation'].isna().all():
+        df['rating'] = df['annotation'].apply(extract_rating)
+    else:
+        print("\nWarning: Could not find rating information")
+    
+    # Clean and filter data
+    df = df.dropna(subset=['text'])
+    if 'rating' in df.columns:
+        df = df.dropna(subset=['rating'])
+        df['rating'] = df['rating'].astype(int)
+        df = df[df['rating'].between(1, 5)]
+    
+    print(f"\nClean dataset size: {len(df)} reviews")
+    
+    # Add preprocessed text
+    df['processed_text'] = df['text'].apply(preprocess_text)
+    return df
+
+# Save the train/validation/test split used for training
+def save_split(split_path, y_train, y_val, y_test):
+    """
+    Save the row indices and training labels of every part of the split
+    
+    Args:
+        split_path (str): Path to the JSON split file
+        y_train, y_val, y_test: Rating Series of the train, validation and test rows (indexed like load_reviews)
+    """
+    ensure_dir(split_path)
+    split = {
+        name: {
+            'index': [int(i) for i in labels.index],
+            'rating': [int(r) for r in labels]
+        }
+        for name, labels in (('train', y_train), ('validation', y_val), ('test', y_test))
+    }
+    with open(split_path, 'w') as f:
+        json.dump(split, f)
+
+# Load the train/validation/test split saved by main
+def load_split(split_path):
+    """
+    Load the split saved by save_split
+    
+    Args:
+        split_path (str): Path to the JSON split file
+        
+    Returns:
+        tuple: (train_index, y_train, val_index, y_val, test_index, y_test) as lists
+    """
+    with open(split_path, 'r') as f:
+        split = json.load(f)
+    return (
+        split['train']['index'],
+        split['train']['rating'],
+        split['validation']['index'],
+        split['validation']['rating'],
+        split['test']['index'],
+        split['test']['rating']
+    )
+
 # Function to predict rating using model components
 # IMPORTANT: This is defined at the global level so it can be imported directly
 def predict_rating(review_text, vectorizer, model, neutral_lower=NEUTRAL_LOWER, neutral_upper=NEUTRAL_UPPER):
@@ -147,48 +248,13 @@ def main(config_path="config.yaml"):
     # Get data path from config
     data_path = config.get('converted_train')
     model_save_path = config.get('model_path')
+    split_save_path = config.get('split_path')
     
     # Make sure model directory exists
     ensure_dir(model_save_path)
     
-    # Load the data
-    print(f"Loading data from: {os.path.basename(data_path)}")
-    df = pd.read_csv(data_path)
-    print(f"Loaded {len(df)} reviews")
-    
-    # Define function to extract rating from prediction column
-    def extract_rating(prediction_str):
-        """Extract the numeric rating from the prediction string"""
-        if pd.isna(prediction_str):
-            return None
-        try:
-            # Parse the string representation of the list containing a dictionary
-            prediction_list = ast.literal_eval(prediction_str.replace("'", "\""))
-            # Extract the label from the first item
-            rating = int(prediction_list[0]['label'])
-            return rating
-        except:
-            return None
-    
-    # Extract ratings
-    if 'prediction' in df.columns:
-        df['rating'] = df['prediction'].apply(extract_rating)
-    elif 'annotation' in df.columns and not df['annotation'].isna().all():
-        df['rating'] = df['annotation'].apply(extract_rating)
-    else:
-        print("\nWarning: Could not find rating information")
-    
-    # Clean and filter data
-    df = df.dropna(subset=['text'])
-    if 'rating' in df.columns:
-        df = df.dropna(subset=['rating'])
-        df['rating'] = df['rating'].astype(int)
-        df = df[df['rating'].between(1, 5)]
-    
-    print(f"\nClean dataset size: {len(df)} reviews")
-    
-    # Add preprocessed text and sentiment
-    df['processed_text'] = df['text'].apply(preprocess_text)
+    # Load and clean the data
+    df = load_reviews(data_path)
     
     # Initialize sentiment analyzer
     sid = SentimentIntensityAnalyzer()
@@ -220,7 +286,8 @@ def main(config_path="config.yaml"):
         
         if num_to_adjust > 0:
             # Select random subset to adjust
-            adjust_indices = np.random.choice(
+            rng = np.random.RandomState(ADJUSTMENT_RANDOM_STATE)
+            adjust_indices = rng.choice(
                 df[adjustment_candidates].index, 
                 size=num_to_adjust, 
                 replace=False
@@ -236,12 +303,22 @@ def main(config_path="config.yaml"):
         X_train, X_test, y_train, y_test = train_test_split(
             df['processed_text'], 
             df['rating'], 
-            test_size=0.2, 
-            random_state=42, 
+            test_size=TEST_SIZE, 
+            random_state=SPLIT_RANDOM_STATE, 
             stratify=df['rating']
         )
         
+        # Hold out validation reviews the model never sees, for tuning later stages (compact_model.py)
+        X_train, X_val, y_train, y_val = train_test_split(
+            X_train,
+            y_train,
+            test_size=VALIDATION_SIZE,
+            random_state=SPLIT_RANDOM_STATE,
+            stratify=y_train
+        )
+        
         print(f"\nTraining set: {len(X_train)} reviews")
+        print(f"Validation set: {len(X_val)} reviews")
         print(f"Test set: {len(X_test)} reviews")
         
         # Create bag-of-words features
@@ -291,6 +368,11 @@ def main(config_path="config.yaml"):
         
         print("Model successfully saved!")
         
+        # Save the split (with the adjusted labels) so later stages evaluate on the same held-out reviews
+        if split_save_path:
+            save_split(split_save_path, y_train, y_val, y_test)
+            print(f"Saved train/validation/test split to {os.path.basename(split_save_path)}")
+        
         # Test example reviews
         example_reviews = [
             "This service is terrible. I waited for hours and no one showed up.",